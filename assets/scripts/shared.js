@@ -23,3 +23,22 @@ attachListener(document, "DOMContentLoaded", function () {
     document.head.appendChild(style);
     style.sheet.insertRule(".js_disabled_only { display: none !important; }");
 });
+
+attachListener(document, "DOMContentLoaded", function () {
+    // autoHeader.py replaces embedded youtube players with a static thumbnail, only load the real player once clicked
+    for (let facade of document.querySelectorAll("a.embedded_youtube")) {
+        attachListener(facade, "click", function (event) {
+            event.preventDefault();
+            let player = document.createElement("iframe");
+            player.className = "embedded_youtube";
+            player.src = facade.href + (facade.href.includes("?") ? "&" : "?") + "autoplay=1";
+            player.title = facade.title;
+            player.setAttribute("frameborder", "0");
+            player.setAttribute("allow", "autoplay; clipboard-write; encrypted-media;");
+            player.setAttribute("allowfullscreen", "");
+            facade.replaceWith(player);
+            // Keep keyboard focus on the player rather than dropping it back to the body
+            player.focus();
+        });
+    }
+});
@@ -1,10 +1,12 @@
 # ##################################################################### #
 # autoHeader.py can be run to automatically insert the header, toolbar, #
 # and footer into all HTML files in the current directory and the godot #
-# directory. It also ensures that all youtube links are uniform.        #
+# directory. It also ensures that all youtube links are uniform, and    #
+# replaces embedded youtube players with static click-to-load facades.  #
 # ##################################################################### #
 
 import os
+import re
 # pip3 install requests
 import requests
 import aiohttp
@@ -23,9 +25,18 @@ class Section(Enum):
 # This prevents a worst case scenario of an 8 second timeout for each web link
 web_link_tasks = []
 
+# Thumbnails for embedded youtube videos are fetched from here once, then served from youtube_thumbnail_dir
+# Set YOUTUBE_THUMBNAIL_HOST to a local server to test the fetch without touching youtube
+youtube_thumbnail_host = os.environ.get("YOUTUBE_THUMBNAIL_HOST", "https://i.ytimg.com")
+youtube_thumbnail_dir = "assets/images/youtube"
+# Matches both unconverted iframes and existing facades, so a deleted thumbnail is fetched again on the next run
+youtube_video_id_pattern = re.compile(r'class="embedded_youtube" (?:src|href)="https://www\.youtube-nocookie\.com/embed/([A-Za-z0-9_-]+)')
+youtube_iframe_pattern = re.compile(r'<iframe class="embedded_youtube" src="https://www\.youtube-nocookie\.com/embed/([A-Za-z0-9_-]+)(\?[^"]*)?"([^>]*)></iframe>')
+
 def main():
     print("Running autoHeader.py")
     headerString, toolbarString, footerString = getTemplateSections()
+    asyncio.run(fetch_all_youtube_thumbnails([".", "./godot", "./recipes"]))
     processFiles(".", headerString, toolbarString, footerString)
     processFiles("./godot", headerString, toolbarString, footerString)
     processFiles("./recipes", headerString, toolbarString, footerString)
@@ -68,6 +79,8 @@ def processFiles(dir: str, headerString: str, toolbarString: str, footerString:
                 if line == "    </head>\n" or line == "        </div>\n":
                     currentSection = Section.NONE
 
+            reconstructedDOM = youtube_iframe_pattern.sub(lambda match: getYoutubeFacade(filename, match), reconstructedDOM)
+
             if dir != ".":
                 reconstructedDOM = reconstructedDOM.replace('href="assets', 'href="../assets')
                 reconstructedDOM = reconstructedDOM.replace('src="assets', 'src="../assets')
@@ -174,6 +187,53 @@ def getTemplateSections() -> tuple[str, str, str]:
 
 
 
+def getYoutubeThumbnailPath(videoId: str) -> str:
+    return youtube_thumbnail_dir + "/" + videoId + ".jpg"
+
+
+
+async def fetchYoutubeThumbnail(session, videoId: str):
+    thumbnailPath: str = getYoutubeThumbnailPath(videoId)
+    try:
+        # maxresdefault is sharp enough for full width embeds, but isn't generated for every video
+        for quality in ["maxresdefault", "hqdefault"]:
+            async with session.get(youtube_thumbnail_host + "/vi/" + videoId + "/" + quality + ".jpg", timeout=8) as response:
+                if response.status == 404 and quality == "maxresdefault":
+                    continue
+                if response.status != 200:
+                    raise Exception("HTTP status code: " + str(response.status))
+                # Don't cache error or captive portal pages that were served with a 200
+                if not response.content_type.startswith("image/"):
+                    raise Exception("Unexpected content type: " + response.content_type)
+                thumbnail: bytes = await response.read()
+            os.makedirs(youtube_thumbnail_dir, exist_ok=True)
+            # Write to a temporary file first, so an interrupted write never leaves a truncated thumbnail in the cache
+            with open(thumbnailPath + ".tmp", "wb") as thumbnailFile:
+                thumbnailFile.write(thumbnail)
+            os.replace(thumbnailPath + ".tmp", thumbnailPath)
+            return
+    except Exception as e:
+        print(" >>> Failed to fetch youtube thumbnail: " + videoId + ": " + (str(e) or type(e).__name__))
+
+
+
+def getYoutubeFacade(pageName: str, match: re.Match) -> str:
+    videoId: str = match.group(1)
+    # Keep any parameters such as start or list, the original iframe is lost once converted
+    query: str = match.group(2) or ""
+    titleMatch = re.search(r'title="([^"]*)"', match.group(3))
+    title: str = titleMatch.group(1) if titleMatch else "YouTube video"
+    thumbnailPath: str = getYoutubeThumbnailPath(videoId)
+    if not os.path.exists(thumbnailPath):
+        # Leave the full player in place, it will be swapped out on the next run
+        print(" >>> " + pageName + " Missing youtube thumbnail, keeping iframe: " + videoId)
+        return match.group(0)
+    # Without javascript the link simply opens the video in a new tab, shared.js swaps it for the player on click
+    return ('<a class="embedded_youtube" href="https://www.youtube-nocookie.com/embed/' + videoId + query + '" title="' + title + '" target="_blank" rel="noopener noreferrer">'
+            + '<img src="' + thumbnailPath + '" alt="' + title + '" loading="lazy"></a>')
+
+
+
 def checkLocalLink(link: str, linkLocation: str):
     if not os.path.exists(link):
         print(" >>> " + linkLocation + " Broken internal link: " + link)
@@ -252,5 +312,21 @@ async def run_all_web_checks():
 
 
 
+# Thumbnails are only ever fetched once, delete the cached file to force a refresh
+# Fetched concurrently before the pages are processed, so an unreachable host only costs a single timeout
+async def fetch_all_youtube_thumbnails(dirs: list[str]):
+    videoIds: set[str] = set()
+    for dir in dirs:
+        for filename in filter(lambda s: s.endswith(".html") and not s.endswith("template.html"), os.listdir(dir)):
+            with open(os.path.join(dir, filename), "r") as webpageFile:
+                videoIds.update(youtube_video_id_pattern.findall(webpageFile.read()))
+    missingVideoIds = [videoId for videoId in sorted(videoIds) if not os.path.exists(getYoutubeThumbnailPath(videoId))]
+    print("Fetching {count} youtube thumbnails...".format(count=len(missingVideoIds)))
+    async with aiohttp.ClientSession() as session:
+        tasks = [fetchYoutubeThumbnail(session, videoId) for videoId in missingVideoIds]
+        await asyncio.gather(*tasks)
+
+
+
 if __name__  == "__main__":
     main()